@@ -0,0 +1,64 @@
+from __future__ import annotations
+from math import inf
+
+import numpy as np
+
+# For a fixed target, the minutes needed to get there only depend on the cell
+# and on the minute within the blizzard period. The index holds that duration
+# for every (m, x, y) of the time-expanded graph. It is filled by sweeping the
+# minutes backwards: a free state takes one minute more than the best state it
+# can move (or wait) to in the next minute. The sweep wraps around the period
+# until no duration changes. Unreachable states end up at -1.
+
+UNREACHABLE = np.iinfo(np.int32).max // 2
+
+
+class ArrivalIndex:
+
+    def __init__(self, valley, target):
+        if valley.position_cache is None:
+            raise ValueError("The arrival index needs the position cache, "
+                             "which a streaming valley doesn't have")
+        self.period = valley.period
+        self.target = target
+        free = self.free_boards(valley)
+
+        durations = np.full(free.shape, UNREACHABLE, dtype=np.int32)
+        durations[free[:, target.x, target.y], target.x, target.y] = 0
+
+        changed = True
+        while changed:
+            changed = False
+            for m in range(self.period - 1, -1, -1):
+                after = durations[(m + 1) % self.period]
+                best = after.copy()
+                np.minimum(best[:-1, :], after[1:, :], out=best[:-1, :])
+                np.minimum(best[1:, :], after[:-1, :], out=best[1:, :])
+                np.minimum(best[:, :-1], after[:, 1:], out=best[:, :-1])
+                np.minimum(best[:, 1:], after[:, :-1], out=best[:, 1:])
+                best += 1
+
+                better = free[m] & (best < durations[m])
+                if better.any():
+                    durations[m][better] = best[better]
+                    changed = True
+
+        durations[durations >= UNREACHABLE] = -1
+        self.durations = durations
+
+    @staticmethod
+    def free_boards(valley) -> np.ndarray:
+        """Returns the free cells of the whole board for every minute of one period, indexed [m][x][y]."""
+        free = np.zeros((valley.period, valley.width, valley.height), dtype=bool)
+        free[:, 1:-1, 1:-1] = valley.position_cache
+        free[:, valley.start.x, valley.start.y] = True
+        free[:, valley.target.x, valley.target.y] = True
+        return free
+
+    def table(self, start) -> np.ndarray:
+        """Returns the minutes from start to the target for every departure minute of one period."""
+        return self.durations[:, start.x, start.y]
+
+    def earliest_arrival(self, start, departure: int) -> int | float:
+        duration = self.durations[departure % self.period, start.x, start.y]
+        return inf if duration < 0 else departure + int(duration)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from disk_cache import load_occupancy
+from main import Pos, Valley
+from occupancy import build_occupancy
+from search import solve
+
+# Solves many (start, target, start_minute) queries on many valley files with
+# a process pool. The occupancy cycle of every valley is built once in the
+# parent and put in shared memory; workers attach to it by name and keep the
+# Valley around for the following queries, so nothing big is pickled per task.
+#
+# In a query, start and target are either a Pos or one of the names "start"
+# and "target", which stand for the entrance and exit of each valley.
+
+Query = Tuple[Pos | str, Pos | str, int]
+Result = Tuple[str, Query, int | float]
+
+DEFAULT_QUERIES = [("start", "target", 0)]
+
+# Valleys attached by this worker process, keyed by shared memory name
+worker_valleys = {}
+
+
+def input_files(inputs: str | List[str]) -> List[str]:
+    if isinstance(inputs, str):
+        if os.path.isdir(inputs):
+            return sorted(
+                os.path.join(inputs, name) for name in os.listdir(inputs)
+                if name.endswith(".txt"))
+        return [inputs]
+    return list(inputs)
+
+
+def resolve(valley: Valley, pos: Pos | str) -> Pos:
+    if pos == "start":
+        return valley.start
+    if pos == "target":
+        return valley.target
+    return pos
+
+
+def attach_valley(lines: List[str], shm_name: str, shape: tuple) -> Valley:
+    if shm_name not in worker_valleys:
+        shm = SharedMemory(name=shm_name)
+        position_cache = np.ndarray(shape, dtype=bool, buffer=shm.buf)
+        worker_valleys[shm_name] = (shm, Valley(lines, position_cache=position_cache))
+    return worker_valleys[shm_name][1]
+
+
+def solve_query(name: str, lines: List[str], shm_name: str, shape: tuple,
+                query: Query, mode: str) -> Result:
+    valley = attach_valley(lines, shm_name, shape)
+    start, target, start_minute = query
+    dist = solve(valley, resolve(valley, start), resolve(valley, target),
+                 start_minute, mode)
+    return name, query, dist
+
+
+def share_occupancy(lines: List[str], cache_dir: str | None,
+                    verify_cache: bool = False) -> Tuple[SharedMemory, tuple]:
+    if cache_dir is None:
+        all_boards = build_occupancy(lines)
+    else:
+        all_boards = load_occupancy(cache_dir, lines, verify_cache)
+
+    shm = SharedMemory(create=True, size=max(all_boards.nbytes, 1))
+    np.ndarray(all_boards.shape, dtype=bool, buffer=shm.buf)[:] = all_boards
+    return shm, all_boards.shape
+
+
+def solve_many(inputs: str | List[str],
+               queries: List[Query] = DEFAULT_QUERIES,
+               mode: str = "frontier",
+               max_workers: int | None = None,
+               cache_dir: str | None = None,
+               verify_cache: bool = False) -> Iterator[Result]:
+    """Yields (file name, query, minutes) for every query on every input, in order of completion."""
+    shared = []
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = []
+            for name in input_files(inputs):
+                with open(name) as file:
+                    lines = file.read().splitlines()
+                shm, shape = share_occupancy(lines, cache_dir, verify_cache)
+                shared.append(shm)
+                futures.extend(
+                    executor.submit(solve_query, name, lines, shm.name, shape,
+                                    query, mode) for query in queries)
+
+            for future in as_completed(futures):
+                yield future.result()
+    finally:
+        for shm in shared:
+            shm.close()
+            shm.unlink()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Solve many valleys and departure minutes in parallel.")
+    parser.add_argument("inputs", nargs="+",
+                        help="valley files or directories of .txt files")
+    parser.add_argument("--minutes", type=int, nargs="+", default=[0],
+                        help="departure minutes, each solved from start to target")
+    parser.add_argument("--mode", default="frontier")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--verify-cache", action="store_true",
+                        help="check cached cycles against their checksum")
+    args = parser.parse_args()
+
+    files = [f for inputs in args.inputs for f in input_files(inputs)]
+    queries = [("start", "target", minute) for minute in args.minutes]
+    for name, (_, _, start_minute), dist in solve_many(
+            files, queries, args.mode, args.workers, args.cache_dir,
+            args.verify_cache):
+        print(f"{name} start_minute={start_minute} dist={dist}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+from __future__ import annotations
+import argparse
+import io
+import json
+import random
+import sys
+import time
+from contextlib import redirect_stdout
+from typing import List
+
+from main import Pos, Valley
+from search import SEARCH_MODES, plan_trip, solve
+from stats import Stats
+
+# Runs every solver on Example.txt, Input.txt and generated valleys of growing
+# size and blizzard density, and checks the answers so a speedup can't quietly
+# break them: the known part 1 / part 2 answers for the two input files, the
+# known period for the generated ones, and that all solvers agree, also on a
+# trip through the center of the valley and on a trip that starts and ends on
+# a cell a blizzard is on at the start. On small
+# valleys the arrival index is also checked against the frontier solver for
+# every interior target and every departure minute of one period.
+
+MODES = SEARCH_MODES + ("index",)
+
+KNOWN_ANSWERS = {
+    "Example.txt": (18, 54),
+    "Input.txt": (343, 960),
+}
+
+# (inner width, inner height, blizzard density, seed, period)
+GENERATED = [
+    (8, 6, 0.3, 1, 24),
+    (20, 10, 0.3, 2, 20),
+    (40, 15, 0.15, 3, 120),
+    (40, 15, 0.3, 4, 120),
+    (40, 15, 0.45, 5, 120),
+    (60, 20, 0.3, 6, 60),
+    (120, 25, 0.3, 7, 600),
+]
+
+
+def generate_valley(inner_width: int, inner_height: int, density: float,
+                    seed: int) -> List[str]:
+    rng = random.Random(seed)
+    lines = ["#." + "#" * inner_width]
+    for _ in range(inner_height):
+        row = "".join(
+            rng.choice("<>^v") if rng.random() < density else "."
+            for _ in range(inner_width))
+        lines.append("#" + row + "#")
+    lines.append("#" * inner_width + ".#")
+    return lines
+
+
+def cases():
+    for name, answers in KNOWN_ANSWERS.items():
+        with open(name) as file:
+            yield name, file.read().splitlines(), None, answers
+
+    for width, height, density, seed, period in GENERATED:
+        name = f"generated {width}x{height} density={density} seed={seed}"
+        yield name, generate_valley(width, height, density, seed), period, None
+
+
+def blocked_cell(lines: List[str]) -> Pos | None:
+    """Returns the first inner cell that a blizzard is on at minute 0."""
+    for y, line in enumerate(lines[1:-1], 1):
+        for x, c in enumerate(line[1:-1], 1):
+            if c in "<>^v":
+                return Pos(x, y)
+    return None
+
+
+def run(lines: List[str], mode: str, track_memory: bool, prune: bool) -> dict:
+    stats = Stats(track_memory)
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        valley = Valley(lines, streaming=mode == "streaming", stats=stats)
+        waypoints = [valley.start, valley.target, valley.start, valley.target]
+        there, _, there_again = plan_trip(valley, waypoints, 0, mode, prune)
+        center = Pos(valley.width // 2, valley.height // 2)
+        via_center = plan_trip(valley, [valley.start, center, valley.target],
+                               0, mode, prune)
+        blocked = blocked_cell(lines)
+        stay = plan_trip(valley, [blocked, blocked], 0, mode, prune) if blocked else []
+
+    return {
+        "mode": mode,
+        "period": valley.period,
+        "part1": there,
+        "part2": there_again,
+        "via_center": via_center,
+        "stay": stay,
+        "wall": time.perf_counter() - start,
+        **stats.to_dict(),
+    }
+
+
+def check(name: str, results: List[dict], period: int | None,
+          answers: tuple | None) -> List[str]:
+    errors = []
+    for result in results:
+        found = (result["part1"], result["part2"])
+        if answers is not None and found != answers:
+            errors.append(f"{name} {result['mode']}: expected {answers}, found {found}")
+        if period is not None and result["period"] != period:
+            errors.append(f"{name}: expected period {period}, found {result['period']}")
+
+    if len({(r["part1"], r["part2"], tuple(r["via_center"]), tuple(r["stay"]))
+            for r in results}) > 1:
+        errors.append(f"{name}: solvers disagree on the answers")
+    return errors
+
+
+# Largest interior cells x period for which the arrival index is fully checked
+INDEX_CHECK_LIMIT = 2000
+
+
+def check_index(name: str, lines: List[str]) -> List[str]:
+    with redirect_stdout(io.StringIO()):
+        valley = Valley(lines)
+    cells = (valley.width - 2) * (valley.height - 2)
+    if cells * valley.period > INDEX_CHECK_LIMIT:
+        return []
+
+    errors = []
+    for x in range(1, valley.width - 1):
+        for y in range(1, valley.height - 1):
+            target = Pos(x, y)
+            index = valley.arrival_index(target)
+            for departure in range(valley.period):
+                expected = departure + solve(valley, valley.start, target,
+                                             departure, "frontier")
+                found = index.earliest_arrival(valley.start, departure)
+                if found != expected:
+                    errors.append(f"{name} index to ({x},{y}) at minute {departure}:"
+                                  f" expected {expected}, found {found}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark and check all solvers.")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip tracemalloc, which slows down the Python solvers")
+    parser.add_argument("--prune", action="store_true",
+                        help="run the solvers with state pruning, see pruning.py")
+    args = parser.parse_args()
+
+    report = []
+    errors = []
+    for name, lines, period, answers in cases():
+        results = [
+            run(lines, mode, not args.no_memory, args.prune) for mode in args.modes
+        ]
+        errors += check(name, results, period, answers)
+        if "index" in args.modes:
+            errors += check_index(name, lines)
+        report.append({"valley": name, "results": results})
+
+        if not args.json:
+            print(name)
+            for r in results:
+                peak = max((p.get("peak_memory", 0) for p in r["phases"].values()), default=0)
+                expanded = r["counters"].get("states_expanded", 0)
+                print(f"  {r['mode']:<10} {r['part1']:>5} {r['part2']:>5}"
+                      f" {r['wall'] * 1000:>9.1f} ms {expanded:>10} expanded"
+                      f" {peak / 2**20:>7.1f} MB peak")
+
+    if args.json:
+        print(json.dumps({"cases": report, "errors": errors}, indent=2))
+    for error in errors:
+        print(f"❌ {error}", file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+import hashlib
+import os
+import tempfile
+from typing import List
+
+import numpy as np
+
+from occupancy import blizzard_period, build_occupancy
+
+# The occupancy cycle of a valley is stored on disk as a .npy file of booleans,
+# named after a hash of the valley lines and the period. Later runs memory-map
+# the file and hand the memmap to the solvers as the position cache, so solver
+# processes working on the same valley share one copy in the page cache. The
+# cells are kept one byte each rather than bit-packed, so they can be read
+# straight from the map without unpacking a private copy first.
+#
+# Next to every cycle a .sha256 sidecar holds the checksum of its cells plus
+# the size and modification time the file had when it was written. Files are
+# written to a temporary name and renamed into place, so a reader never sees a
+# half-written file. An empty file, one with the wrong shape or dtype, one
+# that can't be opened, or one whose size or modification time differ from the
+# sidecar is treated as corrupt and rebuilt. Hashing the cells reads every page
+# of the file, so a warm start only does it when asked to verify.
+
+CACHE_VERSION = 2
+
+
+def cache_key(lines: List[str], period: int) -> str:
+    digest = hashlib.sha256(f"v{CACHE_VERSION}:{period}\n".encode())
+    digest.update("\n".join(lines).encode())
+    return digest.hexdigest()
+
+
+def cache_path(cache_dir: str, lines: List[str], period: int) -> str:
+    return os.path.join(cache_dir, f"occupancy-{cache_key(lines, period)}.npy")
+
+
+def checksum(all_boards: np.ndarray) -> str:
+    return hashlib.sha256(np.ascontiguousarray(all_boards)).hexdigest()
+
+
+def load_occupancy(cache_dir: str, lines: List[str],
+                   verify: bool = False) -> np.ndarray:
+    """Returns the occupancy cycle for the lines, from the disk cache when it holds a valid copy.
+
+    With verify, a cached cycle is also checked against its checksum.
+    """
+    width = len(lines[0])
+    height = len(lines)
+    period = blizzard_period(width, height)
+    path = cache_path(cache_dir, lines, period)
+
+    all_boards = read_cycle(path, lines, period, verify)
+    if all_boards is None:
+        built = build_occupancy(lines)
+        write_cycle(path, built)
+        # Map the new file as well, so this process shares it with later ones
+        all_boards = read_cycle(path, lines, period)
+        if all_boards is None:
+            return built
+
+    return all_boards
+
+
+def read_cycle(path: str, lines: List[str], period: int,
+               verify: bool = False) -> np.memmap | None:
+    expected_shape = (period, len(lines[0]) - 2, len(lines) - 2)
+
+    try:
+        all_boards = np.load(path, mmap_mode="r")
+        stat = os.stat(path)
+    except (EOFError, OSError, ValueError):
+        return None
+
+    if all_boards.shape != expected_shape or all_boards.dtype != bool:
+        return None
+
+    try:
+        with open(path + ".sha256") as file:
+            expected_checksum, size, mtime_ns = file.read().split()
+        written = (int(size), int(mtime_ns))
+    except (OSError, ValueError):
+        return None
+
+    if (stat.st_size, stat.st_mtime_ns) != written:
+        return None
+    if verify and checksum(all_boards) != expected_checksum:
+        return None
+
+    return all_boards
+
+
+def write_cycle(path: str, all_boards: np.ndarray):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    write_atomically(path, lambda file: np.save(file, all_boards))
+    stat = os.stat(path)
+    sidecar = f"{checksum(all_boards)} {stat.st_size} {stat.st_mtime_ns}\n"
+    write_atomically(path + ".sha256", lambda file: file.write(sidecar.encode()))
+
+
+def write_atomically(path: str, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            write(file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,75 @@
+from __future__ import annotations
+from math import inf
+
+import numpy as np
+
+from main import Pos, Valley
+from pruning import Pruner
+from stats import Stats
+
+# Instead of relaxing single vertices, the whole set of cells that can be
+# reached at minute t is moved one minute forward at once:
+#
+#   frontier(t + 1) = (frontier | left | right | up | down) & free(t + 1)
+#
+# The boards are indexed [x][y] like Valley.position_cache and include the
+# walls, which are never free, so the shifted sets never wrap around.
+
+
+def free_board(valley: Valley, minute: int, out: np.ndarray) -> np.ndarray:
+    out[1:-1, 1:-1] = valley.position_cache[minute % valley.period]
+    out[valley.start.x, valley.start.y] = True
+    out[valley.target.x, valley.target.y] = True
+    return out
+
+
+def step(frontier: np.ndarray, free: np.ndarray) -> np.ndarray:
+    reach = frontier.copy()
+    reach[1:, :] |= frontier[:-1, :]
+    reach[:-1, :] |= frontier[1:, :]
+    reach[:, 1:] |= frontier[:, :-1]
+    reach[:, :-1] |= frontier[:, 1:]
+    reach &= free
+    return reach
+
+
+def solve_frontier(valley: Valley, start: Pos, target: Pos,
+                   start_minute: int,
+                   stats: Stats | None = None,
+                   pruner: Pruner | None = None) -> int | float:
+    """Returns the minutes needed to get from start to target when leaving at start_minute."""
+    free = np.zeros((valley.width, valley.height), dtype=bool)
+    frontier = np.zeros_like(free)
+    # A leg can't start on a cell that a blizzard is on at that minute
+    frontier[start.x, start.y] = free_board(valley, start_minute, free)[start.x, start.y]
+    if pruner is not None:
+        pruner.prune_board(frontier, 0)
+    snapshot = frontier
+
+    minute = start_minute
+    expanded = 0
+    reachable = True
+    while not frontier[target.x, target.y]:
+        if stats is not None:
+            expanded += int(np.count_nonzero(frontier))
+        minute += 1
+        frontier = step(frontier, free_board(valley, minute, free))
+        if pruner is not None:
+            pruner.prune_board(frontier, minute - start_minute)
+            if not frontier.any():
+                reachable = False
+                break
+
+        # Waiting at the start is always possible, so every cell reachable at
+        # minute t is reachable again at t + period. When a whole period adds
+        # nothing new the search is going in circles and the target is out of reach.
+        if (minute - start_minute) % valley.period == 0:
+            if np.array_equal(frontier, snapshot):
+                reachable = False
+                break
+            snapshot = frontier
+
+    if stats is not None:
+        stats.count("states_expanded", expanded)
+        stats.count("minutes_simulated", minute - start_minute)
+    return minute - start_minute if reachable else inf
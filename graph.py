@@ -0,0 +1,201 @@
+from __future__ import annotations
+import copy
+from array import array
+from math import inf
+
+import numpy as np
+
+# The time-expanded graph has one state per (x, y, m) with the flat id
+# x + w * (y + h * m), where m is the minute within the blizzard period.
+# Every edge goes from minute m to minute (m + 1) % period, so the adjacency is
+# stored as one CSR block per minute: `offsets` holds layer_size + 1 entries per
+# minute, relative to the first edge of that minute, and `targets` holds the
+# cell (x + w * y) reached in the next minute. Both fit in 16 bits for boards
+# up to 13k cells, which keeps the graph for Input.txt at a few MB.
+#
+# The search state (dist, prev, flags) lives in parallel typed arrays. prev is
+# stored as the index of the move that led to the state, since the previous
+# state always follows from it. The edges only depend on the valley, so a
+# valley builds them once and every search gets a copy with its own state.
+
+MOVES = ((0, 0), (-1, 0), (1, 0), (0, -1), (0, 1))
+NO_PREV = 255
+PROCESSED = 1
+
+
+def shift(board: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    """Returns a board where [y][x] holds board[y + dy][x + dx], False when that is off the board."""
+    h, w = board.shape
+    shifted = np.zeros_like(board)
+    shifted[max(0, -dy):h - max(0, dy), max(0, -dx):w - max(0, dx)] = \
+        board[max(0, dy):h + min(0, dy), max(0, dx):w + min(0, dx)]
+    return shifted
+
+
+class TimeGraph:
+
+    def __init__(self, valley):
+        self.width = valley.width
+        self.height = valley.height
+        self.period = valley.period
+        self.layer_size = self.width * self.height
+        self.size = self.layer_size * self.period
+        self.move_deltas = [dx + self.width * dy for dx, dy in MOVES]
+        self.move_index = {d: i for i, d in enumerate(self.move_deltas)}
+
+        index_type = "H" if len(MOVES) * self.layer_size < 2**16 else "I"
+        self.offsets = array(index_type)
+        self.targets = array(index_type)
+        self.layer_start = array("q", [0])
+        self.num_vertices = 0
+
+        self.build(valley, np.dtype(index_type))
+        self.reset()
+
+    def reset(self):
+        self.dist = array("i", [-1]) * self.size
+        self.prev = bytearray([NO_PREV]) * self.size
+        self.flags = bytearray(self.size)
+
+    def fresh_copy(self) -> TimeGraph:
+        """Returns a graph sharing these edges, with its own search state where nothing is visited yet."""
+        graph = copy.copy(self)
+        graph.reset()
+        return graph
+
+    def build(self, valley, dtype: np.dtype):
+        # Boards indexed [y][x] so that flattening gives the cell x + w * y.
+        # Like Valley.is_open_upgraded, only the entrance and exit are open
+        # in the walls.
+        def board(m: int) -> np.ndarray:
+            b = np.zeros((self.height, self.width), dtype=bool)
+            b[1:-1, 1:-1] = valley.position_cache[m % self.period].T
+            b[valley.start.y, valley.start.x] = True
+            b[valley.target.y, valley.target.x] = True
+            return b
+
+        move_deltas = np.array(self.move_deltas)
+        here = board(0)
+        for m in range(self.period):
+            next_board = board(m + 1)
+            allowed = np.stack([here & shift(next_board, dx, dy) for dx, dy in MOVES])
+            allowed = allowed.reshape(len(MOVES), -1).T
+
+            offsets = np.zeros(self.layer_size + 1, dtype=dtype)
+            offsets[1:] = np.cumsum(allowed.sum(axis=1))
+            cells, moves = np.nonzero(allowed)
+
+            self.offsets.frombytes(offsets.tobytes())
+            self.targets.frombytes((cells + move_deltas[moves]).astype(dtype).tobytes())
+            self.layer_start.append(len(self.targets))
+            self.num_vertices += int(here.sum())
+            here = next_board
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.targets)
+
+    def vertex_id(self, x: int, y: int, m: int) -> int:
+        return x + self.width * (y + self.height * (m % self.period))
+
+    def vertex(self, x: int, y: int, m: int) -> Vertex:
+        return Vertex(self, self.vertex_id(x, y, m))
+
+    def neighbor_ids(self, id: int) -> list:
+        m, cell = divmod(id, self.layer_size)
+        row = m * (self.layer_size + 1) + cell
+        base = self.layer_start[m]
+        next_layer = self.layer_size * ((m + 1) % self.period)
+        return [
+            next_layer + self.targets[base + i]
+            for i in range(self.offsets[row], self.offsets[row + 1])
+        ]
+
+    def prev_id(self, id: int) -> int | None:
+        move = self.prev[id]
+        if move == NO_PREV:
+            return None
+        m, cell = divmod(id, self.layer_size)
+        return cell - self.move_deltas[move] + self.layer_size * ((m - 1) % self.period)
+
+    def nbytes(self) -> int:
+        arrays = (self.offsets, self.targets, self.layer_start, self.dist)
+        return sum(a.itemsize * len(a) for a in arrays) + len(self.prev) + len(self.flags)
+
+
+class Vertex:
+    """View on one state of a TimeGraph, all data lives in the graph's arrays."""
+
+    __slots__ = ("graph", "id")
+
+    def __init__(self, graph: TimeGraph, id: int):
+        self.graph = graph
+        self.id = id
+
+    @property
+    def x(self) -> int:
+        return self.id % self.graph.width
+
+    @property
+    def y(self) -> int:
+        return self.id // self.graph.width % self.graph.height
+
+    @property
+    def m(self) -> int:
+        return self.id // self.graph.layer_size
+
+    @property
+    def key(self) -> tuple:
+        return (self.x, self.y, self.m)
+
+    @property
+    def dist(self) -> int | float:
+        dist = self.graph.dist[self.id]
+        return inf if dist < 0 else dist
+
+    @dist.setter
+    def dist(self, value: int):
+        self.graph.dist[self.id] = value
+
+    @property
+    def prev(self) -> Vertex | None:
+        prev_id = self.graph.prev_id(self.id)
+        return None if prev_id is None else Vertex(self.graph, prev_id)
+
+    @prev.setter
+    def prev(self, other: Vertex):
+        layer_size = self.graph.layer_size
+        delta = self.id % layer_size - other.id % layer_size
+        self.graph.prev[self.id] = self.graph.move_index[delta]
+
+    @property
+    def neighbors(self) -> list:
+        return [Vertex(self.graph, id) for id in self.graph.neighbor_ids(self.id)]
+
+    @property
+    def processed(self) -> bool:
+        return bool(self.graph.flags[self.id] & PROCESSED)
+
+    @processed.setter
+    def processed(self, value: bool):
+        self.set_flag(PROCESSED, value)
+
+    def set_flag(self, flag: int, value: bool):
+        if value:
+            self.graph.flags[self.id] |= flag
+        else:
+            self.graph.flags[self.id] &= ~flag & 0xFF
+
+    def __lt__(self, other):
+        return self.dist < other.dist
+
+    def __repr__(self):
+        return f'Vertex({self.x}, {self.y}, {self.m}) dist={self.dist} processed={self.processed}'
+
+    def __eq__(self, other):
+        if isinstance(other, Vertex):
+            return self.graph is other.graph and self.id == other.id
+        return False
+
+    def __hash__(self):
+        return self.id
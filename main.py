@@ -4,40 +4,26 @@ from __future__ import annotations
 from queue import SimpleQueue, PriorityQueue
 from dataclasses import dataclass, field
 from collections import deque
-from typing import Any, List
-from math import inf
-import datetime
+from typing import Any, List, Tuple
+import sys
+import threading
+
+import numpy as np
+
+from arrival import ArrivalIndex
+from disk_cache import load_occupancy
+from graph import TimeGraph, Vertex
+from occupancy import blizzard_period, build_occupancy
+from stats import Stats
+from streaming import BlizzardIndex
 
 # https://docs.python.org/3/library/queue.html
 # https://linuxhint.com/priority-queue-python/
 
 file_name = "Input.txt"
+cache_dir = ".cache"
 
-PositionCache = List[List[List[bool]]]
-
-
-class Vertex:
-    def __init__(self, x: int, y: int, m: int):
-        self.x = x
-        self.y = y
-        self.m = m
-        self.dist = inf
-        self.neighbors = []
-        self.prev = None
-        self.key = (x, y, m)
-        self.processed = False
-        self.invalidated = False
-
-    def __lt__(self, other):
-        return self.dist < other.dist
-
-    def __repr__(self):
-        return f'Vertex({self.x}, {self.y}, {self.m}) dist={self.dist} processed={self.processed}'
-
-    def __eq__(self, other):
-        if isinstance(other, Vertex):
-            return self.x == other.x and self.y == other.y and self.m == other.m
-        return False
+PositionCache = np.ndarray
 
 
 class Pos:
@@ -72,84 +58,62 @@ class Pos:
 
 class Valley:
 
-    def __init__(self, lines):
+    def __init__(self, lines, streaming=False, cache_dir=None,
+                 position_cache=None, stats=None):
         self.width = len(lines[0])
         self.height = len(lines)
         self.start = Pos(1, 0)
-        # self.start = Pos(self.width - 2, self.height - 1)
-        # self.start_minute = 0
-        self.start_minute = 343 + 320
+        self.start_minute = 0
         self.target = Pos(self.width - 2, self.height - 1)
-        # self.target = Pos(1, 0)
         self.lines = lines
-        self.position_cache = self.cache_positions()
-        self.queue = self.create_vertices(self.start, self.target)
+        self.cache_dir = cache_dir
+        self.stats = stats if stats is not None else Stats(track_memory=False)
+        self.period = blizzard_period(self.width, self.height)
+        self.blizzards = BlizzardIndex(lines)
+        # Streaming valleys create each minute on demand from the blizzard
+        # index, for boards where period x area does not fit in memory
+        if position_cache is not None or streaming:
+            self.position_cache = position_cache
+        else:
+            self.position_cache = self.cache_positions()
+        self.arrival_indexes = {}
+        self.time_graph = None
+        self.time_graph_lock = threading.Lock()
 
     def cache_positions(self) -> PositionCache:
         print("Start caching boards...")
-        pos_width = self.width - 2
-        pos_height = self.height - 2
-        m = 300
-        w = pos_width
-        h = pos_height
-        all_boards = [[[False] * h for _ in range(w)] for _ in range(m)]
-
-        for m in range(m):
-            for y in range(h):
-                for x in range(w):
-                    translated_pos = Pos(x + 1, y + 1)
-                    all_boards[m][x][y] = self.get_pos(
-                        translated_pos, m) == "."
-
+        with self.stats.phase("cache_positions"):
+            if self.cache_dir is None:
+                all_boards = build_occupancy(self.lines)
+            else:
+                all_boards = load_occupancy(self.cache_dir, self.lines)
         print("Finished caching boards")
         return all_boards
 
-    def create_vertices(self, start: Pos, target: Pos) -> PriorityQueue:
-        queue = PriorityQueue()
-
-        self.start_vertex = Vertex(start.x, start.y, self.start_minute)
-        self.start_vertex.dist = 0
-
-        print("Start creating vertices...")
-        dict = {self.start_vertex.key: self.start_vertex}
-
-        for m in range(300):  # Add start vertics for other minutes
-            if m != self.start_minute:
-                other_start_vertex = Vertex(start.x, start.y, m % 300)
-                dict[other_start_vertex.key] = other_start_vertex
-
-        for m in range(300):
-            for y in range(self.height - 2):
-                for x in range(self.width - 2):
-                    new_vertex = Vertex(x + 1, y + 1, m)
-                    if self.is_open_upgraded(Pos(x + 1, y + 1), m):
-                        dict[new_vertex.key] = new_vertex
-
-        for k in dict.keys():
-            queue.put(dict[k])        
-
-        for v in queue.queue:
-            next_positions = self.next_positions(Pos(v.x, v.y), v.m)
-            for next in next_positions:
-                if (next.x == target.x and next.y == target.y):
-                    target_key = (target.x, target.y, (v.m + 1) % 300)
-
-                    if target_key in dict.keys():
-                        target_vertex = dict[target_key]
-                    else:
-                        target_vertex = Vertex(
-                            target.x, target.y, (v.m + 1) % 300)
-                        dict[target_vertex.key] = target_vertex
-                        queue.put(target_vertex)
-
-                    v.neighbors.append(target_vertex)
-                else:
-                    reachable_neighbor = dict[(
-                        next.x, next.y, (v.m + 1) % 300)]
-                    v.neighbors.append(reachable_neighbor)
-
-        print("Finished creating vertices")
-        return queue
+    def create_vertices(self, start: Pos,
+                        start_minute: int) -> Tuple[TimeGraph, Vertex]:
+        """Returns a time-expanded graph with a fresh search state and its vertex for start at start_minute."""
+        # Searches on other threads wait for the first build instead of repeating it
+        with self.time_graph_lock:
+            if self.time_graph is None:
+                print("Start creating vertices...")
+                with self.stats.phase("create_vertices"):
+                    self.time_graph = TimeGraph(self)
+                self.stats.count("vertices", self.time_graph.num_vertices)
+                self.stats.count("edges", self.time_graph.num_edges)
+                print("Finished creating vertices")
+
+        graph = self.time_graph.fresh_copy()
+        start_vertex = graph.vertex(start.x, start.y, start_minute)
+        start_vertex.dist = 0
+        return graph, start_vertex
+
+    def arrival_index(self, target: Pos) -> ArrivalIndex:
+        key = (target.x, target.y)
+        if key not in self.arrival_indexes:
+            with self.stats.phase("arrival_index"):
+                self.arrival_indexes[key] = ArrivalIndex(self, target)
+        return self.arrival_indexes[key]
 
     def get_pos_initial(self, pos) -> str:
         return self.lines[pos.y][pos.x]
@@ -193,8 +157,10 @@ class Valley:
                 or pos.y >= self.height - 1):
             return False
 
-        # 300 only works for Input.txt because that when everything repeats itself on a (150, 20) board
-        return self.position_cache[minutes % 300][pos.x - 1][pos.y - 1]
+        if self.position_cache is None:
+            return self.blizzards.is_free(pos.x - 1, pos.y - 1, minutes)
+
+        return self.position_cache[minutes % self.period, pos.x - 1, pos.y - 1]
 
     def print_valley(self, minutes):
         for y in range(self.height):
@@ -210,8 +176,8 @@ class Valley:
         return Pos((pos.x - 1) % (self.width - 2) + 1,
                    (pos.y - 1) % (self.height - 2) + 1)
 
-    def dist_to_target(self, pos) -> int:
-        return pos.dist(self.target)
+    def dist_to_target(self, pos, target=None) -> int:
+        return pos.dist(target if target is not None else self.target)
 
     def next_positions(self, pos, curr_minute) -> filter[Pos]:
         x = pos.x
@@ -235,49 +201,25 @@ class PrioritizedItem:
     item: Any = field(compare=False)
 
 
-now = datetime.datetime.now()
-print(now)
-
-with open(file_name) as file:
-    valley = Valley(file.read().splitlines())
-
-vertices = []
-for v in valley.queue.queue:
-    vertices.append(v)
-
-num_vertices = len(vertices)
-while not num_vertices == 0:
-    smallest_dist = inf
-    best_vertex = vertices[0]
+if __name__ == "__main__":
+    from search import plan_trip
 
-    for v in vertices:
-        if v.dist < smallest_dist:
-            smallest_dist = v.dist
-            best_vertex = v
+    stats = Stats()
+    with open(file_name) as file:
+        valley = Valley(file.read().splitlines(), cache_dir=cache_dir,
+                        stats=stats)
 
-    if num_vertices % 1000 == 0:
-        now = datetime.datetime.now()
-        print(f"> {num_vertices} -> {now.time()}")
+    there, back, there_again = plan_trip(
+        valley, [valley.start, valley.target, valley.start, valley.target],
+        valley.start_minute)
+    print(f"⚡⚡⚡ Part 1, dist={there - valley.start_minute} ⚡⚡⚡")
+    print(f"⚡⚡⚡ Part 2, dist={there_again - valley.start_minute} ⚡⚡⚡")
 
-    vertices.remove(best_vertex)
-    num_vertices -= 1
-
-    # u = valley.queue.get()
-    u = best_vertex
-    u.processed = True
-
-    if u.x == valley.target.x and u.y == valley.target.y and u.dist < 1000:
-        print(f"⚡⚡⚡ Answer found, dist={u.dist} ⚡⚡⚡")
-
-    for v in u.neighbors:
-
-        if not v.processed:
-            alt = u.dist + 1
-            if alt < v.dist:
-                v.dist = alt
-                v.prev = u
-
-print("End 🏁")
+    if "--json" in sys.argv:
+        print(stats.to_json())
+    else:
+        stats.report()
+    print("End 🏁")
 
 # Answer is 343
 # Part 1 implementation: 321k to 311k in 6m 5s.
@@ -289,5 +231,3 @@ print("End 🏁")
 
 # Answer = 343 + 320 + 297 = 960
 
-
-############### Maybe invalidate existing items in the queue for more performance?
\ No newline at end of file
@@ -0,0 +1,41 @@
+from math import lcm
+from typing import List
+
+import numpy as np
+
+# The blizzards move one step per minute and wrap around the inner board, so
+# horizontal ones repeat every (width - 2) minutes and vertical ones every
+# (height - 2) minutes. The whole valley repeats after the lcm of the two.
+
+
+def blizzard_period(width: int, height: int) -> int:
+    return lcm(width - 2, height - 2)
+
+
+def blizzard_planes(lines: List[str]) -> dict:
+    """Returns one boolean plane per blizzard direction, indexed [x][y] on the inner board."""
+    inner = np.array([list(line[1:-1]) for line in lines[1:-1]]).T
+    return {direction: inner == direction for direction in "<>^v"}
+
+
+def build_occupancy(lines: List[str]) -> np.ndarray:
+    """Returns the free cells of the inner board for every minute of one period, indexed [m][x][y]."""
+    width = len(lines[0])
+    height = len(lines)
+    period = blizzard_period(width, height)
+    planes = blizzard_planes(lines)
+
+    all_boards = np.empty((period, width - 2, height - 2), dtype=bool)
+    for m in range(period):
+        free_cells(planes, m, out=all_boards[m])
+
+    return all_boards
+
+
+def free_cells(planes: dict, minute: int, out: np.ndarray = None) -> np.ndarray:
+    """Returns the free cells of the inner board at the given minute, indexed [x][y]."""
+    occupied = np.roll(planes[">"], minute, axis=0)
+    occupied |= np.roll(planes["<"], -minute, axis=0)
+    occupied |= np.roll(planes["v"], minute, axis=1)
+    occupied |= np.roll(planes["^"], -minute, axis=1)
+    return np.logical_not(occupied, out=out)
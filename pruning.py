@@ -0,0 +1,136 @@
+from __future__ import annotations
+from collections import Counter
+from heapq import heappush, heappop
+from math import inf
+
+import numpy as np
+
+from main import Pos, Valley
+
+# States that can't be on an optimal route, removed by two rules:
+#
+# * time_window: the minutes spent plus the Manhattan distance still to go
+#   exceed an upper bound on the answer, found with a quick greedy run first.
+#   The states the greedy run expands are counted with the search's own.
+# * dominated: (x, y, t mod period) was already reached at an earlier minute.
+#   Everything after the later visit can be done a number of periods earlier.
+#
+# The vertex solvers ask keep() for every new state, the frontier and
+# streaming solvers prune a whole board at once. Dominance is only checked for
+# the boards: the time-expanded graph is folded mod period, so the vertex
+# solvers visit every (x, y, t mod period) once already. That also covers the
+# copies of the entrance for every minute spent waiting there. With a tight
+# greedy bound the window removes most dominated states first, so dominance
+# only fires on legs much longer than the period, like those of Example.txt.
+#
+# On Input.txt this halves the states bfs expands, but doesn't get near an
+# order of magnitude: the optimal route waits about half of its minutes, and
+# a Manhattan window can't rule out the states around those waits. For A*,
+# which already orders states by the same distance, and for the board
+# solvers, where a greedy run costs more than a whole search, pruning is a
+# loss; it is still offered so all modes can be compared.
+
+PRUNING_RULES = ("time_window", "dominated")
+
+# Weight of the distance to go in the greedy run. Higher finds a route sooner
+# but a longer one; 2 finds the optimum on Input.txt after 25k states.
+GREEDY_WEIGHT = 2
+
+
+def greedy_upper_bound(valley: Valley, start: Pos, target: Pos,
+                       start_minute: int) -> tuple:
+    """Returns the minutes of the first route found by a weighted best-first search and the states it expanded."""
+    heap = [(GREEDY_WEIGHT * start.dist(target), start_minute, start.x, start.y)]
+    seen = set()
+
+    while heap:
+        _, minute, x, y = heappop(heap)
+        if x == target.x and y == target.y:
+            return minute - start_minute, len(seen)
+
+        key = (x, y, minute % valley.period)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        for p in valley.next_positions(Pos(x, y), minute):
+            priority = minute + 1 - start_minute + GREEDY_WEIGHT * p.dist(target)
+            heappush(heap, (priority, minute + 1, p.x, p.y))
+
+    return inf, len(seen)
+
+
+class Pruner:
+
+    def __init__(self, valley: Valley, start: Pos, target: Pos,
+                 start_minute: int, upper_bound: int | None = None):
+        self.period = valley.period
+        self.width = valley.width
+        self.target = target
+        self.start_minute = start_minute
+        self.removed = Counter({rule: 0 for rule in PRUNING_RULES})
+        self.greedy_expanded = 0
+
+        if upper_bound is None:
+            upper_bound, self.greedy_expanded = greedy_upper_bound(
+                valley, start, target, start_minute)
+        self.upper_bound = upper_bound
+
+        self.target_dists = np.array(
+            [[Pos(x, y).dist(target) for y in range(valley.height)]
+             for x in range(valley.width)])
+        self.target_dist_list = self.target_dists.tolist()
+        # Cells reached so far per minute of the period, only for the minutes
+        # the search gets to
+        self.seen = {}
+
+    def keep(self, x: int, y: int, elapsed: int) -> bool:
+        """Returns whether the state at (x, y) after elapsed minutes can still be on an optimal route."""
+        if elapsed + self.target_dist_list[x][y] > self.upper_bound:
+            self.removed["time_window"] += 1
+            return False
+        return True
+
+    def prune_board(self, frontier: np.ndarray, elapsed: int) -> np.ndarray:
+        """Removes the pruned states from a frontier board indexed [x][y], in place."""
+        outside = frontier & (self.target_dists > self.upper_bound - elapsed)
+        self.removed["time_window"] += int(np.count_nonzero(outside))
+        frontier &= ~outside
+
+        m = (self.start_minute + elapsed) % self.period
+        seen = self.seen.setdefault(m, np.zeros_like(frontier))
+        dominated = frontier & seen
+        self.removed["dominated"] += int(np.count_nonzero(dominated))
+        frontier &= ~dominated
+        seen |= frontier
+
+        return frontier
+
+    def prune_rows(self, frontier: list, elapsed: int) -> list:
+        """Returns a frontier of row bitmasks without the pruned states."""
+        m = (self.start_minute + elapsed) % self.period
+        seen = self.seen.setdefault(m, [0] * len(frontier))
+
+        pruned = []
+        for y, row in enumerate(frontier):
+            # Columns within the Manhattan budget that is left for this row
+            budget = self.upper_bound - elapsed - abs(y - self.target.y)
+            low = max(0, self.target.x - budget)
+            high = min(self.width - 1, self.target.x + budget)
+            window = ((1 << (high - low + 1)) - 1) << low if low <= high else 0
+
+            self.removed["time_window"] += (row & ~window).bit_count()
+            row &= window
+
+            self.removed["dominated"] += (row & seen[y]).bit_count()
+            row &= ~seen[y]
+            seen[y] |= row
+            pruned.append(row)
+
+        return pruned
+
+    def report(self, stats):
+        stats.count("greedy_expanded", self.greedy_expanded)
+        stats.count("states_expanded", self.greedy_expanded)
+        for rule, removed in self.removed.items():
+            stats.count(f"pruned_{rule}", removed)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+from collections import deque
+from heapq import heappush, heappop
+from math import inf
+from typing import List
+
+from frontier import solve_frontier
+from graph import Vertex
+from main import Pos, PrioritizedItem, Valley
+from pruning import Pruner
+from stats import Stats
+from streaming import solve_streaming
+
+# Every move (or wait) costs exactly one minute, so plain BFS finds the same
+# answer as Dijkstra. A* uses the Manhattan distance to the target, which never
+# overestimates the number of minutes left. The frontier mode skips the
+# vertices altogether and moves the whole reachable set one minute at a time,
+# streaming does the same without a position cache, for huge periods.
+SEARCH_MODES = ("bfs", "dijkstra", "astar", "frontier", "streaming")
+# The modes that search the time-expanded graph
+VERTEX_MODES = ("bfs", "dijkstra", "astar")
+
+
+def solve(valley: Valley,
+          start: Pos,
+          target: Pos,
+          start_minute: int,
+          mode: str = "bfs",
+          prune: bool = False) -> int | float:
+    """Returns the minutes needed to get from start to target when leaving at start_minute.
+
+    With prune, states that can't be on an optimal route are skipped, see pruning.py.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}', expected one of {SEARCH_MODES}")
+
+    if mode != "streaming" and valley.position_cache is None:
+        raise ValueError(f"Mode '{mode}' needs the position cache, "
+                         "use mode 'streaming' on a streaming valley")
+
+    # A leg can't start on a cell that a blizzard is on at that minute, also
+    # when it ends there
+    if not valley.is_open_upgraded(start, start_minute):
+        return inf
+
+    start_vertex = None
+    if mode in VERTEX_MODES:
+        _, start_vertex = valley.create_vertices(start, start_minute)
+
+    with valley.stats.phase("search"):
+        if not prune:
+            return run_search(valley, start, target, start_minute, mode, start_vertex)
+
+        pruner = Pruner(valley, start, target, start_minute)
+        try:
+            # The greedy run explores every state when it finds no route
+            if pruner.upper_bound == inf:
+                return inf
+            return run_search(valley, start, target, start_minute, mode,
+                              start_vertex, pruner)
+        finally:
+            pruner.report(valley.stats)
+
+
+def run_search(valley: Valley,
+               start: Pos,
+               target: Pos,
+               start_minute: int,
+               mode: str,
+               start_vertex: Vertex | None = None,
+               pruner: Pruner | None = None) -> int | float:
+    stats = valley.stats
+    if mode == "frontier":
+        return solve_frontier(valley, start, target, start_minute, stats, pruner)
+
+    if mode == "streaming":
+        return solve_streaming(valley, start, target, start_minute, stats, pruner)
+
+    if mode == "bfs":
+        return bfs(start_vertex, target, stats, pruner)
+
+    return heap_search(valley, start_vertex, target, mode == "astar",
+                       stats, pruner)
+
+
+def plan_trip(valley: Valley,
+              waypoints: List[Pos],
+              start_minute: int,
+              mode: str = "frontier",
+              prune: bool = False) -> List[int | float]:
+    """Returns the arrival minute at every waypoint after the first, walking them in order.
+
+    Besides the search modes, mode "index" answers every leg with a lookup in
+    the valley's arrival index for that leg's target.
+    """
+    for pos in waypoints:
+        check_waypoint(valley, pos)
+
+    arrivals = []
+    minute = start_minute
+    for start, target in zip(waypoints, waypoints[1:]):
+        if minute < inf:
+            if mode == "index":
+                minute = valley.arrival_index(target).earliest_arrival(start, minute)
+            else:
+                minute += solve(valley, start, target, minute, mode, prune)
+        arrivals.append(minute)
+
+    return arrivals
+
+
+def check_waypoint(valley: Valley, pos: Pos):
+    """Raises a ValueError unless pos is the entrance, the exit or a cell of the inner board."""
+    if pos == valley.start or pos == valley.target:
+        return
+    if not (0 < pos.x < valley.width - 1 and 0 < pos.y < valley.height - 1):
+        raise ValueError(f"{pos} is a wall or off the board")
+
+
+def is_target(v: Vertex, target: Pos) -> bool:
+    return v.x == target.x and v.y == target.y
+
+
+def bfs(start_vertex: Vertex,
+        target: Pos,
+        stats: Stats | None = None,
+        pruner: Pruner | None = None) -> int | float:
+    start_vertex.processed = True
+    queue = deque([start_vertex])
+    expanded = 0
+
+    try:
+        while queue:
+            u = queue.popleft()
+            expanded += 1
+            if is_target(u, target):
+                return u.dist
+
+            for v in u.neighbors:
+                if not v.processed:
+                    v.processed = True
+                    if pruner is not None and not pruner.keep(v.x, v.y, u.dist + 1):
+                        continue
+                    v.dist = u.dist + 1
+                    v.prev = u
+                    queue.append(v)
+
+        return inf
+    finally:
+        if stats is not None:
+            stats.count("states_expanded", expanded)
+
+
+def heap_search(valley: Valley, start_vertex: Vertex, target: Pos,
+                use_heuristic: bool,
+                stats: Stats | None = None,
+                pruner: Pruner | None = None) -> int | float:
+
+    def priority(v: Vertex) -> int:
+        if use_heuristic:
+            return v.dist + valley.dist_to_target(Pos(v.x, v.y), target)
+        return v.dist
+
+    heap = [PrioritizedItem(priority(start_vertex), start_vertex)]
+    pushes = 1
+    pops = 0
+    expanded = 0
+
+    try:
+        while heap:
+            u = heappop(heap).item
+            pops += 1
+
+            # Lazy invalidation: instead of updating priorities in place, a vertex
+            # is pushed again when its dist drops and the stale entries are skipped.
+            if u.processed:
+                continue
+            u.processed = True
+            expanded += 1
+
+            if is_target(u, target):
+                return u.dist
+
+            for v in u.neighbors:
+                if not v.processed:
+                    alt = u.dist + 1
+                    if alt < v.dist:
+                        if pruner is not None and not pruner.keep(v.x, v.y, alt):
+                            continue
+                        v.dist = alt
+                        v.prev = u
+                        heappush(heap, PrioritizedItem(priority(v), v))
+                        pushes += 1
+
+        return inf
+    finally:
+        if stats is not None:
+            stats.count("heap_pushes", pushes)
+            stats.count("heap_pops", pops)
+            stats.count("states_expanded", expanded)
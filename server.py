@@ -0,0 +1,194 @@
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from collections import OrderedDict, deque
+from math import inf
+from typing import List
+
+from flask import Flask, jsonify, request
+
+from main import Pos, Valley
+from search import SEARCH_MODES, plan_trip
+
+# Small HTTP service around plan_trip. POST /solve takes
+#
+#   {"valley": "<the valley lines>",
+#    "trips": [{"waypoints": ["start", "target", [1, 0]], "start_minute": 0}],
+#    "mode": "frontier", "prune": false}
+#
+# and returns the arrival minutes of every trip, null when a waypoint can't be
+# reached. Waypoints are "start", "target" or [x, y].
+#
+# Prepared valleys (the occupancy cycle plus the arrival indexes built so far)
+# are kept in an LRU keyed by a hash of the valley lines. Requests that need the
+# same new valley at the same time wait for a single build. Solves on the same
+# valley run in parallel: they only read its occupancy cycle and graph, and
+# every search keeps its state in its own arrays.
+
+MODES = SEARCH_MODES + ("index",)
+VALLEY_CHARS = set("#.<>^v")
+
+
+def valley_error(lines: List[str]) -> str | None:
+    """Returns what is wrong with the valley lines, None when they can be solved."""
+    if len(lines) < 3 or len(lines[0]) < 3 or len({len(line) for line in lines}) != 1:
+        return "the valley must be a rectangle of at least 3x3"
+    unknown = set("".join(lines)) - VALLEY_CHARS
+    if unknown:
+        return f"unknown characters {sorted(unknown)}, expected only '#.<>^v'"
+    if lines[0][1] != "." or lines[-1][-2] != ".":
+        return "the entrance (1, 0) and the exit (width - 2, height - 1) must be open"
+    return None
+
+
+def integer(value, name: str) -> int:
+    # JSON numbers like 1.5 or true would otherwise be truncated by int()
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise ValueError(f"{name} must be a non-negative integer, found {value!r}")
+    return value
+
+
+def percentile(values: List[float], fraction: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ValleyCache:
+
+    def __init__(self, max_valleys: int):
+        self.max_valleys = max_valleys
+        self.valleys = OrderedDict()
+        self.building = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.build_time = 0.0
+
+    @staticmethod
+    def key(lines: List[str]) -> str:
+        return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+    def lookup(self, key: str) -> Valley | None:
+        valley = self.valleys.get(key)
+        if valley is not None:
+            self.valleys.move_to_end(key)
+            self.hits += 1
+        return valley
+
+    def get(self, lines: List[str]) -> Valley:
+        key = self.key(lines)
+        with self.lock:
+            valley = self.lookup(key)
+            if valley is not None:
+                return valley
+            build_lock = self.building.setdefault(key, threading.Lock())
+
+        with build_lock:
+            # Another request may have built it while this one was waiting
+            with self.lock:
+                valley = self.lookup(key)
+                if valley is not None:
+                    return valley
+                self.misses += 1
+
+            start = time.perf_counter()
+            try:
+                valley = Valley(lines)
+
+                with self.lock:
+                    self.build_time += time.perf_counter() - start
+                    self.valleys[key] = valley
+                    while len(self.valleys) > self.max_valleys:
+                        self.valleys.popitem(last=False)
+            finally:
+                # Also when the build fails, so the next request can try again
+                with self.lock:
+                    if self.building.get(key) is build_lock:
+                        del self.building[key]
+
+        return valley
+
+
+def create_app(max_valleys: int = 16, max_latencies: int = 10000) -> Flask:
+    app = Flask(__name__)
+    cache = ValleyCache(max_valleys)
+    latencies = deque(maxlen=max_latencies)
+    latencies_lock = threading.Lock()
+
+    def bad_request(message: str):
+        return jsonify(error=message), 400
+
+    def waypoint(valley: Valley, value) -> Pos:
+        if value == "start":
+            return valley.start
+        if value == "target":
+            return valley.target
+        x, y = (integer(c, "a waypoint coordinate") for c in value)
+        if not (0 <= x < valley.width and 0 <= y < valley.height):
+            raise ValueError(f"waypoint {value} is outside the "
+                             f"{valley.width}x{valley.height} valley")
+        return Pos(x, y)
+
+    @app.post("/solve")
+    def solve():
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(body.get("valley"), str):
+            return bad_request("expected a JSON body with a 'valley' string")
+
+        lines = body["valley"].strip().splitlines()
+        error = valley_error(lines)
+        if error is not None:
+            return bad_request(error)
+
+        mode = body.get("mode", "frontier")
+        if mode not in MODES:
+            return bad_request(f"unknown mode '{mode}', expected one of {MODES}")
+
+        try:
+            valley = cache.get(lines)
+        except Exception as e:
+            return jsonify(error=f"could not prepare the valley: {e!r}"), 500
+
+        start = time.perf_counter()
+        try:
+            trips = [
+                plan_trip(valley,
+                          [waypoint(valley, w) for w in trip["waypoints"]],
+                          integer(trip.get("start_minute", 0), "start_minute"), mode,
+                          bool(body.get("prune", False)))
+                for trip in body.get("trips", [])
+            ]
+        except (KeyError, TypeError, ValueError) as e:
+            return bad_request(f"invalid trip: {e}")
+
+        with latencies_lock:
+            latencies.append(time.perf_counter() - start)
+
+        return jsonify(arrivals=[
+            [None if minute == inf else minute for minute in arrivals]
+            for arrivals in trips
+        ])
+
+    @app.get("/metrics")
+    def metrics():
+        with latencies_lock:
+            recent = list(latencies)
+        with cache.lock:
+            return jsonify(
+                cache_hits=cache.hits,
+                cache_misses=cache.misses,
+                cached_valleys=len(cache.valleys),
+                build_time=cache.build_time,
+                solves=len(recent),
+                solve_latency_p50=percentile(recent, 0.50),
+                solve_latency_p99=percentile(recent, 0.99),
+            )
+
+    return app
+
+
+if __name__ == "__main__":
+    create_app().run()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+import json
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+# Collects wall time and peak memory per phase (cache_positions,
+# create_vertices, search) plus counters such as vertices, edges, heap pushes
+# and pops and states expanded. Phases that run more than once, like the search
+# for every leg of a trip, add up their times and keep the highest peak.
+#
+# Peak memory comes from tracemalloc, which NumPy reports its buffers to as
+# well. Tracing slows down the pure Python solvers, so it can be switched off.
+
+
+class Stats:
+
+    def __init__(self, track_memory: bool = True):
+        self.track_memory = track_memory
+        self.phases = {}
+        self.counters = Counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        started_tracing = self.track_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            base_memory = tracemalloc.get_traced_memory()[0]
+
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            wall = time.perf_counter() - start
+            phase = self.phases.setdefault(name, {"calls": 0, "wall": 0.0})
+            phase["calls"] += 1
+            phase["wall"] += wall
+
+            if self.track_memory:
+                peak = tracemalloc.get_traced_memory()[1] - base_memory
+                phase["peak_memory"] = max(phase.get("peak_memory", 0), peak)
+            if started_tracing:
+                tracemalloc.stop()
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] += n
+
+    def to_dict(self) -> dict:
+        return {"phases": self.phases, "counters": dict(self.counters)}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def report(self):
+        for name, phase in self.phases.items():
+            memory = ""
+            if "peak_memory" in phase:
+                memory = f", peak {phase['peak_memory'] / 2**20:.1f} MB"
+            print(f"{name}: {phase['wall'] * 1000:.1f} ms in {phase['calls']} call(s){memory}")
+        for name, value in sorted(self.counters.items()):
+            print(f"{name}: {value}")
@@ -0,0 +1,110 @@
+from __future__ import annotations
+from math import inf
+from typing import List
+
+# Streaming mode never materializes a board per minute. The initial blizzards
+# are kept as one bitmask per row (bit x set when a blizzard is in column x of
+# the inner board), which is enough to produce the free cells of any minute:
+#
+# * '>' and '<' stay in their row and rotate through the columns,
+# * 'v' and '^' keep their column, so row y at minute t holds the vertical
+#   blizzards that started in row (y - t) or (y + t).
+#
+# The reachable set is stored the same way, one bitmask per board row, and is
+# moved forward by shifting. Memory depends on the board area only.
+
+
+def rotate_left(mask: int, steps: int, width: int) -> int:
+    steps %= width
+    return ((mask << steps) | (mask >> (width - steps))) & ((1 << width) - 1)
+
+
+class BlizzardIndex:
+    """Blizzards of the initial board as per-row column bitmasks of the inner board."""
+
+    def __init__(self, lines: List[str]):
+        self.width = len(lines[0]) - 2
+        self.height = len(lines) - 2
+        self.right = [self.row_mask(line, ">") for line in lines[1:-1]]
+        self.left = [self.row_mask(line, "<") for line in lines[1:-1]]
+        self.down = [self.row_mask(line, "v") for line in lines[1:-1]]
+        self.up = [self.row_mask(line, "^") for line in lines[1:-1]]
+
+    @staticmethod
+    def row_mask(line: str, direction: str) -> int:
+        mask = 0
+        for x, c in enumerate(line[1:-1]):
+            if c == direction:
+                mask |= 1 << x
+        return mask
+
+    def free_row(self, y: int, minute: int) -> int:
+        """Returns the free columns of inner row y at the given minute as a bitmask."""
+        occupied = rotate_left(self.right[y], minute, self.width)
+        occupied |= rotate_left(self.left[y], -minute, self.width)
+        occupied |= self.down[(y - minute) % self.height]
+        occupied |= self.up[(y + minute) % self.height]
+        return ~occupied & ((1 << self.width) - 1)
+
+    def is_free(self, x: int, y: int, minute: int) -> bool:
+        return bool(self.free_row(y, minute) >> x & 1)
+
+
+def free_rows(valley, minute: int) -> List[int]:
+    """Returns the free cells of the whole board at the given minute, one bitmask per board row."""
+    rows = [0] + [
+        valley.blizzards.free_row(y, minute) << 1
+        for y in range(valley.height - 2)
+    ] + [0]
+    rows[valley.start.y] |= 1 << valley.start.x
+    rows[valley.target.y] |= 1 << valley.target.x
+    return rows
+
+
+def step(frontier: List[int], free: List[int]) -> List[int]:
+    last = len(frontier) - 1
+    return [
+        (row | row << 1 | row >> 1
+         | (frontier[y - 1] if y > 0 else 0)
+         | (frontier[y + 1] if y < last else 0)) & free[y]
+        for y, row in enumerate(frontier)
+    ]
+
+
+def solve_streaming(valley, start, target, start_minute: int,
+                    stats=None, pruner=None) -> int | float:
+    """Returns the minutes needed to get from start to target when leaving at start_minute."""
+    frontier = [0] * valley.height
+    # A leg can't start on a cell that a blizzard is on at that minute
+    frontier[start.y] = free_rows(valley, start_minute)[start.y] & 1 << start.x
+    if pruner is not None:
+        frontier = pruner.prune_rows(frontier, 0)
+    snapshot = frontier
+
+    minute = start_minute
+    expanded = 0
+    reachable = True
+    while not frontier[target.y] >> target.x & 1:
+        if stats is not None:
+            expanded += sum(row.bit_count() for row in frontier)
+        minute += 1
+        frontier = step(frontier, free_rows(valley, minute))
+        if pruner is not None:
+            frontier = pruner.prune_rows(frontier, minute - start_minute)
+            if not any(frontier):
+                reachable = False
+                break
+
+        # Every cell reachable at minute t is reachable again at t + period by
+        # waiting at the start first, so (x, y, t mod period) only has to be
+        # remembered once per period: when a period adds nothing new, stop.
+        if (minute - start_minute) % valley.period == 0:
+            if frontier == snapshot:
+                reachable = False
+                break
+            snapshot = frontier
+
+    if stats is not None:
+        stats.count("states_expanded", expanded)
+        stats.count("minutes_simulated", minute - start_minute)
+    return minute - start_minute if reachable else inf
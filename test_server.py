@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import server
+from benchmark import generate_valley
+from server import ValleyCache, create_app
+
+with open("Example.txt") as file:
+    EXAMPLE = file.read()
+
+
+def post(app, body):
+    return app.test_client().post("/solve", json=body)
+
+
+def metrics(app):
+    return app.test_client().get("/metrics").get_json()
+
+
+def test_solves_the_example():
+    app = create_app()
+    response = post(app, {
+        "valley": EXAMPLE,
+        "trips": [{"waypoints": ["start", "target", "start", "target"]}],
+    })
+    assert response.status_code == 200
+    assert response.get_json() == {"arrivals": [[18, 41, 54]]}
+
+
+@pytest.mark.parametrize("mode", server.MODES)
+def test_every_mode_agrees(mode):
+    app = create_app()
+    response = post(app, {
+        "valley": EXAMPLE,
+        "trips": [{"waypoints": ["start", "target"], "start_minute": 3}],
+        "mode": mode,
+    })
+    assert response.get_json() == {"arrivals": [[18]]}
+
+
+def test_concurrent_requests_build_the_valley_once():
+    app = create_app()
+    body = {"valley": EXAMPLE, "trips": [{"waypoints": ["start", "target"]}]}
+    with ThreadPoolExecutor(5) as pool:
+        responses = list(pool.map(lambda _: post(app, body), range(5)))
+
+    assert [r.get_json() for r in responses] == [{"arrivals": [[18]]}] * 5
+    found = metrics(app)
+    assert found["cache_misses"] == 1
+    assert found["cache_hits"] == 4
+    assert found["cached_valleys"] == 1
+    assert found["solves"] == 5
+    assert found["solve_latency_p50"] <= found["solve_latency_p99"]
+
+
+def test_least_recently_used_valley_is_evicted():
+    app = create_app(max_valleys=2)
+    valleys = ["\n".join(generate_valley(6, 4, 0.3, seed)) for seed in range(3)]
+    post(app, {"valley": valleys[0]})
+    post(app, {"valley": valleys[1]})
+    # Using valley 0 again makes valley 1 the least recently used one
+    post(app, {"valley": valleys[0]})
+    post(app, {"valley": valleys[2]})
+    found = metrics(app)
+    assert found["cached_valleys"] == 2
+    assert (found["cache_hits"], found["cache_misses"]) == (1, 3)
+
+    post(app, {"valley": valleys[0]})
+    assert (metrics(app)["cache_hits"], metrics(app)["cache_misses"]) == (2, 3)
+    post(app, {"valley": valleys[1]})
+    assert (metrics(app)["cache_hits"], metrics(app)["cache_misses"]) == (2, 4)
+
+
+@pytest.mark.parametrize("body", [
+    None,
+    {"trips": []},
+    {"valley": "#.#\n#.#"},
+    {"valley": "##\n##\n##"},
+    {"valley": "#.#\n#x#\n#.#"},
+    {"valley": "###\n#.#\n#.#"},
+    {"valley": EXAMPLE, "mode": "dfs"},
+    {"valley": EXAMPLE, "trips": [{}]},
+    {"valley": EXAMPLE, "trips": [{"waypoints": ["start", [99, 99]]}]},
+    {"valley": EXAMPLE, "trips": [{"waypoints": ["start", [-1, 0]]}]},
+    {"valley": EXAMPLE, "trips": [{"waypoints": ["start", [0, 0]]}]},
+    {"valley": EXAMPLE, "trips": [{"waypoints": ["start", "exit"]}]},
+    {"valley": EXAMPLE, "trips": [{"waypoints": ["start", [1.5, 1]]}]},
+    {"valley": EXAMPLE, "trips": [{"waypoints": ["start", "target"], "start_minute": 1.5}]},
+])
+def test_bad_requests_are_rejected(body):
+    response = post(create_app(), body)
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+
+def test_failed_build_can_be_retried(monkeypatch):
+    def fail(lines):
+        raise MemoryError("no room for the cycle")
+
+    cache = ValleyCache(max_valleys=2)
+    lines = EXAMPLE.splitlines()
+    monkeypatch.setattr(server, "Valley", fail)
+    with pytest.raises(MemoryError):
+        cache.get(lines)
+    assert cache.building == {}
+
+    monkeypatch.undo()
+    assert cache.get(lines).period == 12
+
+
+def test_failed_build_is_a_json_error(monkeypatch):
+    def fail(lines):
+        raise MemoryError("no room for the cycle")
+
+    monkeypatch.setattr(server, "Valley", fail)
+    response = post(create_app(), {"valley": EXAMPLE})
+    assert response.status_code == 500
+    assert "MemoryError" in response.get_json()["error"]